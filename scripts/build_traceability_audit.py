@@ -1,22 +1,46 @@
 #!/usr/bin/env python3
+"""Build a traceability audit HTML report from Doorstop items.
+
+Requires PyYAML. Item files are parsed with the libyaml-backed CSafeLoader
+when PyYAML was built with libyaml, falling back to the pure-Python
+SafeLoader otherwise. The report data is serialized with orjson when it is
+installed and with the standard json module otherwise.
+"""
 from __future__ import annotations
 
 import argparse
+import base64
+import gzip
 import json
+import os
+import re
 import sys
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import BinaryIO
 
 import yaml
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 DEFAULT_REQ_DIRS = ["reqs/mon"]
 DEFAULT_TEST_DIRS = ["reqs/tst"]
+ITEM_EXTENSIONS = (".yml", ".yaml")
 SKIP_NAMES = {
     ".doorstop.yml",
     "doorstop.yml",
     ".doorstop.skip",
     ".doorstop.skip-all",
 }
+PLACEHOLDER_RE = re.compile(r"__(DATA_TYPE|SOURCE_ROOT|GENERATED_AT|TITLE|SUBTITLE)__")
 
 TEMPLATE = r"""<!doctype html>
 <html lang="en">
@@ -292,43 +316,56 @@ TEMPLATE = r"""<!doctype html>
       max-height: 420px;
     }
 
-    .matrix table {
-      border: none;
-      box-shadow: none;
-      min-width: 600px;
+    .matrix canvas {
+      display: block;
+      cursor: crosshair;
+      image-rendering: pixelated;
     }
 
-    .matrix th, .matrix td {
-      text-align: center;
-      padding: 8px 10px;
+    .matrix-grid {
+      display: grid;
+      grid-template-columns: max-content max-content;
+      width: max-content;
     }
 
-    .matrix th {
+    .matrix-corner, .matrix-cols, .matrix-rows {
       position: sticky;
-      top: 0;
       background: #f5eee4;
-      z-index: 2;
+      font-family: "JetBrains Mono", "SFMono-Regular", Menlo, monospace;
+      font-size: calc(var(--cell) - 2px);
+      color: var(--muted);
     }
 
-    .matrix .row-head {
-      position: sticky;
-      left: 0;
-      background: #f5eee4;
-      z-index: 1;
-      text-align: left;
-      font-family: "JetBrains Mono", "SFMono-Regular", Menlo, monospace;
+    .matrix-corner { top: 0; left: 0; z-index: 3; }
+    .matrix-cols { top: 0; z-index: 2; display: flex; }
+    .matrix-rows { left: 0; z-index: 1; }
+
+    .matrix-cols div {
+      width: var(--cell);
+      max-height: 120px;
+      padding: 6px 0;
+      line-height: var(--cell);
+      writing-mode: vertical-rl;
+      transform: rotate(180deg);
+      white-space: nowrap;
+      overflow: hidden;
+      text-overflow: ellipsis;
     }
 
-    .dot {
-      display: inline-block;
-      width: 10px;
-      height: 10px;
-      border-radius: 50%;
-      background: #d7c8b5;
+    .matrix-rows div {
+      height: var(--cell);
+      line-height: var(--cell);
+      padding: 0 8px;
+      text-align: right;
+      white-space: nowrap;
     }
 
-    .dot.on {
-      background: var(--accent);
+    .matrix-caption {
+      margin-top: 8px;
+      min-height: 18px;
+      color: var(--muted);
+      font-size: 12px;
+      font-family: "JetBrains Mono", "SFMono-Regular", Menlo, monospace;
     }
 
     .footer {
@@ -390,20 +427,44 @@ TEMPLATE = r"""<!doctype html>
     <section class="section" id="matrix-section" style="display:none;">
       <h2>Traceability Matrix</h2>
       <div class="matrix" id="matrix"></div>
+      <div class="matrix-caption" id="matrix-caption">Hover a cell to see its requirement and test.</div>
     </section>
 
     <div class="footer">Audit view generated from Doorstop item files.</div>
   </div>
 
-  <script id="data" type="application/json">__DATA_JSON__</script>
-  <script>
-    const data = JSON.parse(document.getElementById('data').textContent);
+  <script id="data" type="__DATA_TYPE__">__DATA_JSON__</script>
+  <script type="module">
+    async function loadData() {
+      const el = document.getElementById('data');
+      if (el.getAttribute('type') !== 'application/octet-stream') {
+        return JSON.parse(el.textContent);
+      }
+      const raw = Uint8Array.from(atob(el.textContent.trim()), c => c.charCodeAt(0));
+      const stream = new Blob([raw]).stream().pipeThrough(new DecompressionStream('gzip'));
+      return JSON.parse(await new Response(stream).text());
+    }
+
+    const data = await loadData();
     const searchInput = document.getElementById('search');
     const statusFilter = document.getElementById('status-filter');
     const showMatrix = document.getElementById('show-matrix');
     const showTests = document.getElementById('show-tests');
     const testsSection = document.getElementById('tests-section');
     const matrixSection = document.getElementById('matrix-section');
+    const reqTable = document.getElementById('req-table');
+    const reqDetail = document.getElementById('req-detail');
+    let matrixRendered = false;
+    const reqMap = Object.fromEntries(data.requirements.map(r => [r.id, r]));
+    const testMap = Object.fromEntries(data.tests.map(t => [t.id, t]));
+    // Search text is fixed per item, so build it once rather than on every keystroke.
+    const hayByItem = new Map([...data.requirements, ...data.tests].map(item => [item, [
+      item.id,
+      item.text,
+      (item.refs || []).join(' '),
+      (item.tests || item.reqs || []).join(' '),
+      (item.links || []).join(' '),
+    ].join(' ').toLowerCase()]));
 
     const summary = data.summary;
     const summaryCards = [
@@ -430,15 +491,7 @@ TEMPLATE = r"""<!doctype html>
       const status = statusFilter.value;
       return items.filter(item => {
         const matchesStatus = status === 'all' || item.status === status;
-        const related = item.tests || item.reqs || [];
-        const hay = [
-          item.id,
-          item.text,
-          (item.refs || []).join(' '),
-          related.join(' '),
-          (item.links || []).join(' '),
-        ].join(' ').toLowerCase();
-        const matchesTerm = !term || hay.includes(term);
+        const matchesTerm = !term || hayByItem.get(item).includes(term);
         return matchesStatus && matchesTerm;
       });
     }
@@ -456,42 +509,35 @@ TEMPLATE = r"""<!doctype html>
         }),
         '</tbody></table>'
       ].join('');
-      document.getElementById('req-table').innerHTML = html;
-
-      const detail = document.getElementById('req-detail');
-      const reqMap = Object.fromEntries(data.requirements.map(r => [r.id, r]));
-      const testMap = Object.fromEntries(data.tests.map(t => [t.id, t]));
-      document.querySelectorAll('#req-table tbody tr').forEach(row => {
-        row.addEventListener('click', () => {
-          const id = row.getAttribute('data-req');
-          const req = reqMap[id];
-          const linked = req.tests.length
-            ? req.tests.map(t => {
-                const refs = (testMap[t].refs || []).map(r => `<div class="refs">${r}</div>`).join('') || '<div class="refs muted">No references</div>';
-                return `<div style="margin-bottom:8px;"><span class="chip">${t}</span>${refs}</div>`;
-              }).join('')
-            : '<span class="muted">None</span>';
-          detail.innerHTML = `
-            <div style="display:flex;justify-content:space-between;align-items:center;gap:12px;flex-wrap:wrap;">
-              <div><strong>${req.id}</strong></div>
-              <div>${req.status === 'linked' ? '<span class="badge ok">Linked</span>' : '<span class="badge warn">Unlinked</span>'}</div>
-            </div>
-            <p class="muted">${req.path}</p>
-            <pre>${req.text}</pre>
-            <div><strong>Linked tests</strong>:</div>
-            <div>${linked}</div>
-          `;
-        });
-      });
+      reqTable.innerHTML = html;
 
       if (rows.length) {
-        const first = document.querySelector('#req-table tbody tr');
-        if (first) { first.click(); }
+        showReqDetail(rows[0].id);
       } else {
-        detail.innerHTML = '<div class="muted">No matching requirements.</div>';
+        reqDetail.innerHTML = '<div class="muted">No matching requirements.</div>';
       }
     }
 
+    function showReqDetail(id) {
+      const req = reqMap[id];
+      const linked = req.tests.length
+        ? req.tests.map(t => {
+            const refs = (testMap[t].refs || []).map(r => `<div class="refs">${r}</div>`).join('') || '<div class="refs muted">No references</div>';
+            return `<div style="margin-bottom:8px;"><span class="chip">${t}</span>${refs}</div>`;
+          }).join('')
+        : '<span class="muted">None</span>';
+      reqDetail.innerHTML = `
+        <div style="display:flex;justify-content:space-between;align-items:center;gap:12px;flex-wrap:wrap;">
+          <div><strong>${req.id}</strong></div>
+          <div>${req.status === 'linked' ? '<span class="badge ok">Linked</span>' : '<span class="badge warn">Unlinked</span>'}</div>
+        </div>
+        <p class="muted">${req.path}</p>
+        <pre>${req.text}</pre>
+        <div><strong>Linked tests</strong>:</div>
+        <div>${linked}</div>
+      `;
+    }
+
     function renderTestTable() {
       const rows = filterItems(data.tests);
       const html = [
@@ -510,18 +556,71 @@ TEMPLATE = r"""<!doctype html>
     }
 
     function renderMatrix() {
-      const reqs = data.requirements;
-      const tests = data.tests;
-      const linkSet = new Set(data.links.map(l => `${l.req}::${l.test}`));
-      const head = ['<th></th>', ...tests.map(t => `<th>${t.id}</th>`)].join('');
-      const body = reqs.map(r => {
-        const cells = tests.map(t => {
-          const on = linkSet.has(`${r.id}::${t.id}`);
-          return `<td><span class="dot ${on ? 'on' : ''}"></span></td>`;
-        }).join('');
-        return `<tr><th class="row-head">${r.id}</th>${cells}</tr>`;
-      }).join('');
-      document.getElementById('matrix').innerHTML = `<table><thead><tr>${head}</tr></thead><tbody>${body}</tbody></table>`;
+      const { req_ids: reqIds, test_ids: testIds, edges } = data.matrix;
+      // Browsers cap canvas sides (~32k px) and total area (Safari: 16.7M px), so size
+      // cells from both budgets; below one pixel per cell the matrix is downsampled.
+      const rowCount = Math.max(reqIds.length, 1);
+      const colCount = Math.max(testIds.length, 1);
+      let cell = Math.min(12, 16384 / Math.max(rowCount, colCount), Math.sqrt(16777216 / (rowCount * colCount)));
+      if (cell >= 1) { cell = Math.floor(cell); }
+      const canvas = document.createElement('canvas');
+      canvas.width = Math.max(Math.floor(colCount * cell), 1);
+      canvas.height = Math.max(Math.floor(rowCount * cell), 1);
+      const ctx = canvas.getContext('2d');
+      const caption = document.getElementById('matrix-caption');
+      if (!ctx) {
+        document.getElementById('matrix').innerHTML = '<div class="muted" style="padding:12px;">The matrix is too large to draw in this browser.</div>';
+        caption.textContent = '';
+        return;
+      }
+      const styles = getComputedStyle(document.documentElement);
+      const inset = cell > 4 ? 1 : 0;
+      const size = Math.max(cell - 2 * inset, 1);
+      ctx.fillStyle = styles.getPropertyValue('--bg-2').trim();
+      ctx.fillRect(0, 0, canvas.width, canvas.height);
+      ctx.fillStyle = styles.getPropertyValue('--accent').trim();
+      for (const [i, j] of edges) {
+        const x = Math.min(Math.floor(j * cell), canvas.width - 1);
+        const y = Math.min(Math.floor(i * cell), canvas.height - 1);
+        ctx.fillRect(x + inset, y + inset, size, size);
+      }
+      if (cell < 1) {
+        const span = Math.ceil(1 / cell);
+        caption.textContent = `Downsampled: each pixel covers up to ${span}\u00d7${span} cells.`;
+      } else if (cell < 8) {
+        caption.textContent = 'Too many rows or columns for readable labels; hover a cell to identify it.';
+      }
+
+      const linked = new Set(edges.map(([i, j]) => i * testIds.length + j));
+      const cellAt = event => {
+        const rect = canvas.getBoundingClientRect();
+        const i = Math.floor((event.clientY - rect.top) / cell);
+        const j = Math.floor((event.clientX - rect.left) / cell);
+        return i >= 0 && i < reqIds.length && j >= 0 && j < testIds.length ? [i, j] : null;
+      };
+      canvas.addEventListener('mousemove', event => {
+        const hit = cellAt(event);
+        if (!hit) { return; }
+        const [i, j] = hit;
+        caption.textContent = `${reqIds[i]} \u00d7 ${testIds[j]}: ${linked.has(i * testIds.length + j) ? 'linked' : 'not linked'}`;
+      });
+      canvas.addEventListener('click', event => {
+        const hit = cellAt(event);
+        if (hit) { showReqDetail(reqIds[hit[0]]); }
+      });
+      const matrixEl = document.getElementById('matrix');
+      if (cell >= 8) {
+        matrixEl.innerHTML = `
+          <div class="matrix-grid" style="--cell:${cell}px;">
+            <div class="matrix-corner"></div>
+            <div class="matrix-cols">${testIds.map(id => `<div title="${id}">${id}</div>`).join('')}</div>
+            <div class="matrix-rows">${reqIds.map(id => `<div>${id}</div>`).join('')}</div>
+            <div id="matrix-canvas"></div>
+          </div>`;
+        document.getElementById('matrix-canvas').replaceChildren(canvas);
+      } else {
+        matrixEl.replaceChildren(canvas);
+      }
     }
 
     function wireDownloads() {
@@ -537,7 +636,10 @@ TEMPLATE = r"""<!doctype html>
 
       document.getElementById('download-links').addEventListener('click', () => {
         const header = 'requirement_id,test_id\n';
-        const rows = data.links.map(l => `${l.req},${l.test}`).join('\n');
+        const links = data.links || data.requirements
+          .flatMap(r => r.tests.map(t => ({req: r.id, test: t})))
+          .sort((a, b) => a.req < b.req ? -1 : a.req > b.req ? 1 : 0);
+        const rows = links.map(l => `${l.req},${l.test}`).join('\n');
         const blob = new Blob([header + rows], {type: 'text/csv'});
         const url = URL.createObjectURL(blob);
         const a = document.createElement('a');
@@ -553,9 +655,21 @@ TEMPLATE = r"""<!doctype html>
       renderTestTable();
     }
 
-    searchInput.addEventListener('input', update);
+    let searchTimer = 0;
+    searchInput.addEventListener('input', () => {
+      clearTimeout(searchTimer);
+      searchTimer = setTimeout(() => requestAnimationFrame(update), 120);
+    });
     statusFilter.addEventListener('change', update);
+    reqTable.addEventListener('click', event => {
+      const row = event.target.closest('tr[data-req]');
+      if (row) { showReqDetail(row.getAttribute('data-req')); }
+    });
     showMatrix.addEventListener('change', () => {
+      if (showMatrix.checked && !matrixRendered) {
+        renderMatrix();
+        matrixRendered = true;
+      }
       matrixSection.style.display = showMatrix.checked ? 'block' : 'none';
     });
     showTests.addEventListener('change', () => {
@@ -563,7 +677,6 @@ TEMPLATE = r"""<!doctype html>
     });
 
     renderCards();
-    renderMatrix();
     wireDownloads();
     update();
   </script>
@@ -601,108 +714,151 @@ def parse_args() -> argparse.Namespace:
         default="Audit-focused view of requirement coverage and test linkage.",
         help="Report subtitle.",
     )
+    parser.add_argument(
+        "--emit-links",
+        action="store_true",
+        help="Also embed the flat requirement/test links list in the report data.",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="Embed the report data gzip-compressed and base64-encoded (decoded in the browser).",
+    )
     return parser.parse_args()
 
 
+def walk_item_files(dir_path: str) -> list[str]:
+    item_files: list[str] = []
+    stack = [dir_path]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except PermissionError:
+            # Match Path.rglob, which skips directories it cannot read.
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif (
+                    entry.name.endswith(ITEM_EXTENSIONS)
+                    and entry.name not in SKIP_NAMES
+                    and entry.is_file()
+                ):
+                    item_files.append(entry.path)
+    item_files.sort()
+    return item_files
+
+
+def read_item(item_file: str) -> dict:
+    with open(item_file, "rb") as fh:
+        return yaml.load(fh, Loader=SafeLoader) or {}
+
+
 def load_items(root: Path, rel_dirs: list[str], label: str) -> list[dict]:
     items: list[dict] = []
     seen: set[str] = set()
+    root_prefix = os.path.join(os.fspath(root), "")
+    item_files: list[str] = []
     for rel_dir in rel_dirs:
         dir_path = (root / rel_dir).resolve()
         if not dir_path.exists():
             raise FileNotFoundError(f"{label} directory not found: {dir_path}")
-        for ext in ("*.yml", "*.yaml"):
-            for item_file in sorted(dir_path.rglob(ext)):
-                if item_file.name in SKIP_NAMES:
-                    continue
-                data = yaml.safe_load(item_file.read_text(encoding="utf-8")) or {}
-                uid = str(data.get("uid") or item_file.stem)
-                if uid in seen:
-                    raise ValueError(f"Duplicate item id '{uid}' in {item_file}")
-                seen.add(uid)
-                text = data.get("text") or data.get("title") or ""
-                if not isinstance(text, str):
-                    text = str(text)
-                links = data.get("links") or []
-                if isinstance(links, str):
-                    links = [links]
-                elif not isinstance(links, list):
-                    links = []
-                links = [str(link) for link in links]
-                try:
-                    rel_path = item_file.relative_to(root)
-                except ValueError:
-                    rel_path = item_file
-                items.append(
-                    {
-                        "id": uid,
-                        "text": text.rstrip(),
-                        "links": links,
-                        "path": str(rel_path),
-                    }
-                )
+        item_files.extend(walk_item_files(os.fspath(dir_path)))
+
+    for item_file in item_files:
+        data = read_item(item_file)
+        uid = str(data.get("uid") or os.path.splitext(os.path.basename(item_file))[0])
+        if uid in seen:
+            raise ValueError(f"Duplicate item id '{uid}' in {item_file}")
+        seen.add(uid)
+        text = data.get("text") or data.get("title") or ""
+        if not isinstance(text, str):
+            text = str(text)
+        links = data.get("links") or []
+        if isinstance(links, str):
+            links = [links]
+        elif not isinstance(links, list):
+            links = []
+        links = [str(link) for link in links]
+        item_path = item_file
+        if item_path.startswith(root_prefix):
+            item_path = item_path[len(root_prefix):]
+        items.append(
+            {
+                "id": uid,
+                "text": text.rstrip(),
+                "links": links,
+                "path": item_path,
+            }
+        )
     return items
 
 
 def extract_refs(text: str) -> list[str]:
     refs: list[str] = []
-    lines = [line.rstrip() for line in text.splitlines()]
+    if "References:" not in text:
+        return refs
     in_refs = False
-    for line in lines:
-        if line.strip() == "References:":
+    for line in text.splitlines():
+        line = line.strip()
+        if line == "References:":
             in_refs = True
             continue
         if in_refs:
-            if not line.strip():
+            if not line:
                 break
-            if line.strip().startswith("- "):
-                refs.append(line.strip()[2:])
+            if line.startswith("- "):
+                refs.append(line[2:])
             else:
                 break
     return refs
 
 
-def build_payload(root: Path, req_dirs: list[str], test_dirs: list[str]) -> dict:
+def build_payload(
+    root: Path, req_dirs: list[str], test_dirs: list[str], emit_links: bool = False
+) -> dict:
     reqs = load_items(root, req_dirs, "Requirement")
     tests = load_items(root, test_dirs, "Test")
 
-    req_map = {r["id"]: r for r in reqs}
-    test_map = {t["id"]: t for t in tests}
+    req_to_tests: dict[str, set[str]] = {r["id"]: set() for r in reqs}
+    test_to_reqs: dict[str, set[str]] = {t["id"]: set() for t in tests}
 
     for test in tests:
         test["refs"] = extract_refs(test["text"])
-
-    link_set: set[tuple[str, str]] = set()
-    for test in tests:
+        linked_reqs = test_to_reqs[test["id"]]
         for req_id in test["links"]:
-            if req_id in req_map:
-                link_set.add((req_id, test["id"]))
+            if req_id in req_to_tests:
+                req_to_tests[req_id].add(test["id"])
+                linked_reqs.add(req_id)
     for req in reqs:
+        linked_tests = req_to_tests[req["id"]]
         for test_id in req["links"]:
-            if test_id in test_map:
-                link_set.add((req["id"], test_id))
-
-    req_to_tests = {req_id: [] for req_id in req_map}
-    test_to_reqs = {test_id: [] for test_id in test_map}
-    for req_id, test_id in sorted(link_set):
-        req_to_tests[req_id].append(test_id)
-        test_to_reqs[test_id].append(req_id)
+            if test_id in test_to_reqs:
+                linked_tests.add(test_id)
+                test_to_reqs[test_id].add(req["id"])
 
+    links_total = 0
+    reqs_linked = 0
     for req in reqs:
-        req["tests"] = sorted(req_to_tests.get(req["id"], []))
+        req["tests"] = sorted(req_to_tests[req["id"]])
         req["status"] = "linked" if req["tests"] else "unlinked"
+        links_total += len(req["tests"])
+        reqs_linked += bool(req["tests"])
+    tests_linked = 0
     for test in tests:
-        test["reqs"] = sorted(test_to_reqs.get(test["id"], []))
+        test["reqs"] = sorted(test_to_reqs[test["id"]])
         test["status"] = "linked" if test["reqs"] else "unlinked"
+        tests_linked += bool(test["reqs"])
 
     summary = {
         "requirements_total": len(reqs),
         "tests_total": len(tests),
-        "links_total": len(link_set),
-        "requirements_linked": sum(1 for r in reqs if r["tests"]),
-        "requirements_unlinked": sum(1 for r in reqs if not r["tests"]),
-        "tests_linked": sum(1 for t in tests if t["reqs"]),
-        "tests_unlinked": sum(1 for t in tests if not t["reqs"]),
+        "links_total": links_total,
+        "requirements_linked": reqs_linked,
+        "requirements_unlinked": len(reqs) - reqs_linked,
+        "tests_linked": tests_linked,
+        "tests_unlinked": len(tests) - tests_linked,
     }
     summary["coverage_pct"] = (
         round(100.0 * summary["requirements_linked"] / summary["requirements_total"], 1)
@@ -710,14 +866,46 @@ def build_payload(root: Path, req_dirs: list[str], test_dirs: list[str]) -> dict
         else 0.0
     )
 
-    return {
+    test_index = {test["id"]: j for j, test in enumerate(tests)}
+    matrix = {
+        "req_ids": [req["id"] for req in reqs],
+        "test_ids": [test["id"] for test in tests],
+        "edges": [
+            [i, test_index[test_id]] for i, req in enumerate(reqs) for test_id in req["tests"]
+        ],
+    }
+
+    payload = {
         "generated_at": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%SZ"),
         "source_root": str(root),
         "summary": summary,
         "requirements": reqs,
         "tests": tests,
-        "links": [{"req": req_id, "test": test_id} for req_id, test_id in sorted(link_set)],
-    }
+        "matrix": matrix,
+    }
+    if emit_links:
+        payload["links"] = [
+            {"req": req["id"], "test": test_id}
+            for req in sorted(reqs, key=lambda r: r["id"])
+            for test_id in req["tests"]
+        ]
+    return payload
+
+
+def write_data_json(fh: BinaryIO, payload: dict, compress: bool = False) -> None:
+    if compress:
+        if orjson is not None:
+            raw = orjson.dumps(payload)
+        else:
+            raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        # Base64 output cannot contain '</', so no script-boundary escape is needed.
+        fh.write(base64.b64encode(gzip.compress(raw, mtime=0)))
+        return
+    if orjson is not None:
+        fh.write(orjson.dumps(payload).replace(b"</", b"<\\/"))
+        return
+    data_json = json.dumps(payload, ensure_ascii=True, separators=(",", ":"))
+    fh.write(data_json.replace("</", "<\\/").encode("ascii"))
 
 
 def main() -> int:
@@ -727,18 +915,23 @@ def main() -> int:
     test_dirs = args.test_dir or DEFAULT_TEST_DIRS
     out_path = Path(args.out) if args.out else root / "visual" / "traceability_audit.html"
 
-    payload = build_payload(root, req_dirs, test_dirs)
-    data_json = json.dumps(payload, ensure_ascii=True).replace("</", "<\\/")
-    html = (
-        TEMPLATE.replace("__DATA_JSON__", data_json)
-        .replace("__SOURCE_ROOT__", payload["source_root"])
-        .replace("__GENERATED_AT__", payload["generated_at"])
-        .replace("__TITLE__", args.title)
-        .replace("__SUBTITLE__", args.subtitle)
-    )
+    payload = build_payload(root, req_dirs, test_dirs, emit_links=args.emit_links)
+    substitutions = {
+        "DATA_TYPE": "application/octet-stream" if args.compress else "application/json",
+        "SOURCE_ROOT": payload["source_root"],
+        "GENERATED_AT": payload["generated_at"],
+        "TITLE": args.title,
+        "SUBTITLE": args.subtitle,
+    }
+    head, _, tail = TEMPLATE.partition("__DATA_JSON__")
+    head = PLACEHOLDER_RE.sub(lambda m: substitutions[m.group(1)], head)
+    tail = PLACEHOLDER_RE.sub(lambda m: substitutions[m.group(1)], tail)
 
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(html, encoding="utf-8")
+    with out_path.open("wb") as fh:
+        fh.write(head.encode("utf-8"))
+        write_data_json(fh, payload, compress=args.compress)
+        fh.write(tail.encode("utf-8"))
     print(f"Wrote {out_path}")
     return 0
 